@@ -5,19 +5,26 @@ Clean, well-structured backend with proper error handling and documentation
 
 from fastapi import FastAPI, File, UploadFile, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 import uvicorn
 import os
 import tempfile
 import logging
-from typing import List, Dict, Any, Optional
+from typing import TYPE_CHECKING, Optional
 import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-# Import our custom modules
+# Import our custom modules. query_engine pulls in torch, transformers and
+# sentence-transformers, so it is only imported inside lifespan: spawned PDF
+# worker processes re-import this module and must not load the ML stack.
 from pdf_processor import PDFProcessor
-from query_engine import QueryEngine
+
+if TYPE_CHECKING:
+    from query_engine import QueryEngine
 
 # Configure logging
 logging.basicConfig(
@@ -26,13 +33,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Size the default executor and load the query engine before serving"""
+    global query_engine
+    from query_engine import QueryEngine
+
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS))
+    query_engine = await loop.run_in_executor(None, QueryEngine)
+    yield
+
 # Initialize FastAPI app
 app = FastAPI(
+    lifespan=lifespan,
     title="PDF Chat Application",
     description="Upload PDF documents and chat with their content using AI",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -62,18 +82,25 @@ class UploadResponse(BaseModel):
     file_size: int
     processing_time: float
 
-# Global instances
+# Global instances; the query engine loads models, so it is created in lifespan
+# rather than on import (spawned PDF worker processes re-import this module)
 pdf_processor = PDFProcessor()
-query_engine = QueryEngine()
-
-# In-memory storage for chat history (last 5 messages)
-chat_history: List[Dict[str, Any]] = []
-current_document: Optional[str] = None
+query_engine: Optional["QueryEngine"] = None
 
 # Configuration
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1MB
 ALLOWED_EXTENSIONS = {'.pdf'}
 MAX_CHAT_HISTORY = 5
+EXECUTOR_WORKERS = 8  # Threads for blocking PDF processing and model inference
+
+# In-memory storage for chat history (last N messages, oldest evicted first)
+chat_history: deque = deque(maxlen=MAX_CHAT_HISTORY)
+current_document: Optional[str] = None
+
+# Guards chat_history and current_document; only held for short updates, never
+# across model work. Both are tied to the query engine's document generation.
+_state_lock = asyncio.Lock()
 
 @app.get("/")
 async def root():
@@ -82,7 +109,7 @@ async def root():
         "message": "PDF Chat Application API",
         "status": "healthy",
         "version": "1.0.0",
-        "timestamp": datetime.now().isoformat()
+        "timestamp": datetime.now()
     }
 
 @app.get("/health")
@@ -96,7 +123,7 @@ async def health_check():
             "document_loaded": current_document is not None
         },
         "chat_history_count": len(chat_history),
-        "timestamp": datetime.now().isoformat()
+        "timestamp": datetime.now()
     }
 
 @app.post("/upload", response_model=UploadResponse)
@@ -131,26 +158,34 @@ async def upload_pdf(file: UploadFile = File(...)):
                 detail="Only PDF files are allowed"
             )
         
-        # Read file content
-        content = await file.read()
-        file_size = len(content)
-        
-        # Check file size
-        if file_size > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail=f"File size ({file_size} bytes) exceeds maximum allowed size ({MAX_FILE_SIZE} bytes)"
-            )
-        
-        # Process PDF with temporary file
+        # Stream file content to a temporary file in fixed-size chunks
+        file_size = 0
         with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            temp_file.write(content)
             temp_file_path = temp_file.name
+            try:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    file_size += len(chunk)
+                    
+                    # Check file size
+                    if file_size > MAX_FILE_SIZE:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"File size exceeds maximum allowed size ({MAX_FILE_SIZE} bytes)"
+                        )
+                    
+                    temp_file.write(chunk)
+            except BaseException:
+                temp_file.close()
+                os.unlink(temp_file_path)
+                raise
         
         try:
             # Extract text and create embeddings
             logger.info(f"Processing PDF: {file.filename}")
-            chunks = pdf_processor.extract_text_chunks(temp_file_path)
+            loop = asyncio.get_running_loop()
+            chunks = await loop.run_in_executor(
+                None, pdf_processor.extract_text_chunks, temp_file_path
+            )
             
             if not chunks:
                 raise HTTPException(
@@ -159,12 +194,14 @@ async def upload_pdf(file: UploadFile = File(...)):
                 )
             
             # Initialize query engine with document chunks
-            query_engine.initialize_document(chunks)
+            generation = await loop.run_in_executor(None, query_engine.initialize_document, chunks)
             
-            # Update global state
-            global current_document, chat_history
-            current_document = file.filename
-            chat_history.clear()  # Clear previous chat history
+            # Update global state, unless a later upload has already replaced this document
+            global current_document
+            async with _state_lock:
+                if generation == query_engine.document_generation:
+                    current_document = file.filename
+                    chat_history.clear()  # Clear previous chat history
             
             processing_time = (datetime.now() - start_time).total_seconds()
             
@@ -232,7 +269,9 @@ async def query_document(message: ChatMessage):
         
         # Process query
         logger.info(f"Processing query: {query[:50]}...")
-        response, chunks_used = query_engine.query(query)
+        generation = query_engine.document_generation
+        loop = asyncio.get_running_loop()
+        response, chunks_used = await loop.run_in_executor(None, query_engine.query, query)
         
         processing_time = (datetime.now() - start_time).total_seconds()
         timestamp = datetime.now()
@@ -245,11 +284,11 @@ async def query_document(message: ChatMessage):
             "chunks_used": chunks_used
         }
         
-        chat_history.append(chat_entry)
-        
-        # Keep only last N messages
-        if len(chat_history) > MAX_CHAT_HISTORY:
-            chat_history.pop(0)
+        # Only the last MAX_CHAT_HISTORY messages are kept; skip entries for a
+        # document that was replaced while the query ran
+        async with _state_lock:
+            if generation == query_engine.document_generation:
+                chat_history.append(chat_entry)
         
         logger.info(f"Query processed successfully in {processing_time:.2f}s")
         
@@ -273,7 +312,7 @@ async def query_document(message: ChatMessage):
 async def get_chat_history():
     """Get the current chat history"""
     return {
-        "history": chat_history,
+        "history": list(chat_history),
         "document": current_document,
         "total_messages": len(chat_history)
     }
@@ -281,8 +320,8 @@ async def get_chat_history():
 @app.delete("/chat-history")
 async def clear_chat_history():
     """Clear the chat history"""
-    global chat_history
-    chat_history.clear()
+    async with _state_lock:
+        chat_history.clear()
     return {"message": "Chat history cleared"}
 
 @app.get("/document-status")
@@ -298,7 +337,7 @@ async def get_document_status():
 # Error handlers
 @app.exception_handler(404)
 async def not_found_handler(request, exc):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=404,
         content={"detail": "Endpoint not found"}
     )
@@ -306,12 +345,14 @@ async def not_found_handler(request, exc):
 @app.exception_handler(500)
 async def internal_error_handler(request, exc):
     logger.error(f"Internal server error: {str(exc)}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Internal server error"}
     )
 
 if __name__ == "__main__":
+    # uvicorn[standard] installs uvloop and httptools; uvicorn's default
+    # loop="auto" / http="auto" picks them up and falls back where unavailable
     logger.info("Starting PDF Chat Application Server...")
     uvicorn.run(
         "main:app",
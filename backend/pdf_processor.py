@@ -6,17 +6,89 @@ Handles PDF text extraction and chunking with improved error handling
 import pdfplumber
 import re
 import logging
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
 import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+def _spawn_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """
+    Create a process pool whose workers start from a fresh interpreter
+    
+    Forking a process that already runs torch, tokenizer and server threads
+    can deadlock the child on locks inherited from those threads.
+    
+    Args:
+        max_workers: Number of worker processes
+        
+    Returns:
+        ProcessPoolExecutor using the spawn start method
+    """
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+# Page extraction strategies, checked in order: the first rule whose
+# max_pages covers the document wins. Pool overhead dominates on tiny PDFs,
+# while large PDFs are CPU-bound enough to justify separate processes.
+PARSING_STRATEGIES = [
+    {'name': 'serial', 'max_pages': 10, 'executor': None, 'batch_size': None},
+    {'name': 'thread-batch', 'max_pages': 200, 'executor': ThreadPoolExecutor, 'batch_size': 10},
+    {'name': 'process-pool', 'max_pages': None, 'executor': _spawn_process_pool, 'batch_size': 500},
+]
+
+PageResult = Tuple[int, Optional[str], Optional[str]]
+
+
+def _iter_page_range(pdf, first_page: int, last_page: int) -> Iterator[PageResult]:
+    """
+    Extract text from a contiguous range of pages of an open PDF
+    
+    Args:
+        pdf: Open pdfplumber document
+        first_page: 1-based number of the first page in the range
+        last_page: 1-based number of the last page in the range (inclusive)
+        
+    Yields:
+        (page number, page text, error message) tuples
+    """
+    for page_num in range(first_page, last_page + 1):
+        try:
+            yield page_num, pdf.pages[page_num - 1].extract_text(), None
+        except Exception as e:
+            yield page_num, None, str(e)
+
+
+def _extract_page_range(pdf_path: str, first_page: int, last_page: int) -> List[PageResult]:
+    """
+    Extract text from a contiguous range of PDF pages
+    
+    Runs inside a worker thread or process, so it opens its own handle.
+    
+    Args:
+        pdf_path: Path to PDF file
+        first_page: 1-based number of the first page in the range
+        last_page: 1-based number of the last page in the range (inclusive)
+        
+    Returns:
+        List of (page number, page text, error message) tuples
+    """
+    with pdfplumber.open(pdf_path) as pdf:
+        return list(_iter_page_range(pdf, first_page, last_page))
+
+
 class PDFProcessor:
     """
     Enhanced PDF processor with better text extraction and chunking
     """
     
+    # Hyphenated words across lines, or lower/upper case letters glued together
+    # Lookaheads leave the following character unconsumed so adjacent matches still apply
+    _RE_WORD_JOIN = re.compile(r'(\w)-\n(?=\w)|([a-z])(?=[A-Z])')
+    _RE_WS = re.compile(r'\s+')
+    
     def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
         """
         Initialize PDF processor
@@ -46,21 +118,12 @@ class PDFProcessor:
             if not os.path.exists(pdf_path):
                 raise FileNotFoundError(f"PDF file not found: {pdf_path}")
             
-            # Extract text from PDF
-            full_text = self._extract_full_text(pdf_path)
+            # Stream cleaned page texts into the chunker
+            page_texts = self._iter_page_texts(pdf_path)
             
-            if not full_text.strip():
-                raise ValueError("No text content found in PDF")
-            
-            # Clean and preprocess text
-            cleaned_text = self._clean_text(full_text)
-            
-            # Split into chunks
-            chunks = self._create_chunks(cleaned_text)
-            
-            # Add metadata to chunks
+            # Add metadata to chunks as they are produced
             chunks_with_metadata = []
-            for i, chunk in enumerate(chunks):
+            for i, chunk in enumerate(self._create_chunks(page_texts)):
                 chunks_with_metadata.append({
                     'text': chunk,
                     'chunk_id': i,
@@ -68,6 +131,9 @@ class PDFProcessor:
                     'source': Path(pdf_path).name
                 })
             
+            if not chunks_with_metadata:
+                raise ValueError("No text content found in PDF")
+            
             logger.info(f"Successfully extracted {len(chunks_with_metadata)} chunks from {Path(pdf_path).name}")
             return chunks_with_metadata
             
@@ -75,43 +141,88 @@ class PDFProcessor:
             logger.error(f"Error processing PDF {pdf_path}: {str(e)}")
             raise
     
-    def _extract_full_text(self, pdf_path: str) -> str:
+    def _iter_page_texts(self, pdf_path: str) -> Iterator[str]:
         """
-        Extract all text from PDF using pdfplumber
+        Extract and clean PDF text one page at a time using pdfplumber
         
         Args:
             pdf_path: Path to PDF file
             
-        Returns:
-            Complete text content from PDF
+        Yields:
+            Cleaned text of each page that contains text, in page order
         """
-        full_text = ""
-        
         try:
             with pdfplumber.open(pdf_path) as pdf:
-                logger.info(f"Processing PDF with {len(pdf.pages)} pages")
+                page_count = len(pdf.pages)
+                strategy = self._select_strategy(page_count)
+                logger.info(f"Processing PDF with {page_count} pages using {strategy['name']} strategy")
                 
-                for page_num, page in enumerate(pdf.pages, 1):
-                    try:
-                        # Extract text from page
-                        page_text = page.extract_text()
-                        
-                        if page_text:
-                            # Add page separator
-                            full_text += f"\n--- Page {page_num} ---\n"
-                            full_text += page_text + "\n"
-                        else:
-                            logger.warning(f"No text found on page {page_num}")
-                            
-                    except Exception as e:
-                        logger.warning(f"Error processing page {page_num}: {str(e)}")
+                # Serial extraction keeps reading from this handle; pools open their own
+                if strategy['executor'] is None:
+                    page_results = _iter_page_range(pdf, 1, page_count)
+                else:
+                    page_results = self._extract_pages_parallel(pdf_path, page_count, strategy)
+                
+                for page_num, page_text, error in page_results:
+                    if error:
+                        logger.warning(f"Error processing page {page_num}: {error}")
                         continue
+                    
+                    cleaned_text = self._clean_text(page_text) if page_text else ""
+                    if cleaned_text:
+                        yield cleaned_text
+                    else:
+                        logger.warning(f"No text found on page {page_num}")
                         
         except Exception as e:
-            logger.error(f"Error opening PDF file: {str(e)}")
+            logger.error(f"Error reading PDF file: {str(e)}")
             raise
+    
+    @staticmethod
+    def _select_strategy(page_count: int) -> Dict[str, any]:
+        """
+        Pick the extraction strategy for a document of the given size
+        
+        Args:
+            page_count: Number of pages in the PDF
+            
+        Returns:
+            Matching entry from PARSING_STRATEGIES
+        """
+        for strategy in PARSING_STRATEGIES:
+            if strategy['max_pages'] is None or page_count <= strategy['max_pages']:
+                return strategy
+        return PARSING_STRATEGIES[-1]
+    
+    def _extract_pages_parallel(self, pdf_path: str, page_count: int, strategy: Dict[str, any]) -> Iterator[PageResult]:
+        """
+        Extract all pages in batches on the strategy's worker pool
+        
+        Args:
+            pdf_path: Path to PDF file
+            page_count: Number of pages in the PDF
+            strategy: Entry from PARSING_STRATEGIES with an executor
+            
+        Yields:
+            (page number, page text, error message) tuples in page order
+        """
+        max_workers = max(1, (os.cpu_count() or 2) - 1)
+        
+        # Never make batches so large that workers sit idle
+        batch_size = min(strategy['batch_size'], -(-page_count // max_workers))
+        batches = [
+            (first_page, min(first_page + batch_size - 1, page_count))
+            for first_page in range(1, page_count + 1, batch_size)
+        ]
         
-        return full_text
+        with strategy['executor'](max_workers=min(max_workers, len(batches))) as executor:
+            futures = [
+                executor.submit(_extract_page_range, pdf_path, first_page, last_page)
+                for first_page, last_page in batches
+            ]
+            # Hand batches on in page order as soon as each one finishes
+            for future in futures:
+                yield from future.result()
     
     def _clean_text(self, text: str) -> str:
         """
@@ -123,73 +234,87 @@ class PDFProcessor:
         Returns:
             Cleaned and normalized text
         """
-        # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
+        # Fix common PDF extraction issues in a single pass
+        text = self._RE_WORD_JOIN.sub(self._fix_word_join, text)
         
-        # Remove page separators for cleaner chunking
-        text = re.sub(r'\n--- Page \d+ ---\n', '\n\n', text)
-        
-        # Fix common PDF extraction issues
-        text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)  # Add space between joined words
-        text = re.sub(r'(\w)-\n(\w)', r'\1\2', text)  # Fix hyphenated words across lines
-        text = re.sub(r'\n+', '\n', text)  # Remove excessive newlines
-        
-        # Remove extra spaces
-        text = re.sub(r' +', ' ', text)
+        # Collapse all whitespace, including newlines, last
+        text = self._RE_WS.sub(' ', text)
         
         return text.strip()
     
-    def _create_chunks(self, text: str) -> List[str]:
+    @staticmethod
+    def _fix_word_join(match: re.Match) -> str:
+        """Rejoin a hyphenated word or split two words glued together"""
+        if match.group(1) is not None:
+            return match.group(1)
+        return match.group(2) + ' '
+    
+    def _create_chunks(self, page_texts: Iterable[str]) -> Iterator[str]:
         """
-        Split text into overlapping chunks
+        Split a stream of page texts into overlapping chunks
+        
+        Only a rolling buffer of roughly one chunk plus the current page is
+        held in memory, so chunks are emitted as soon as enough text arrives.
         
         Args:
-            text: Cleaned text to chunk
+            page_texts: Cleaned page texts in document order
             
-        Returns:
-            List of text chunks
+        Yields:
+            Text chunks
         """
-        if len(text) <= self.chunk_size:
-            return [text]
-        
-        chunks = []
+        # Window of pending text; chunks are sliced out by offset and the
+        # consumed prefix is only dropped once per page
+        window = ""
         start = 0
         
-        while start < len(text):
-            # Calculate end position
-            end = start + self.chunk_size
+        for page_text in page_texts:
+            window = f"{window[start:]} {page_text}" if len(window) > start else page_text
+            start = 0
             
-            # If this is not the last chunk, try to break at sentence boundary
-            if end < len(text):
-                # Look for sentence endings within the last 200 characters
-                search_start = max(end - 200, start)
-                sentence_endings = [
-                    text.rfind('.', search_start, end),
-                    text.rfind('!', search_start, end),
-                    text.rfind('?', search_start, end),
-                    text.rfind('\n', search_start, end)
-                ]
+            # More text than one chunk means the next chunk is not the last
+            while len(window) - start > self.chunk_size:
+                end = self._find_chunk_end(window, start)
                 
-                best_end = max([pos for pos in sentence_endings if pos > search_start], default=end)
-                if best_end > search_start:
-                    end = best_end + 1
-            
-            # Extract chunk
-            chunk = text[start:end].strip()
-            if chunk:
-                chunks.append(chunk)
-            
-            # Calculate next start position with overlap
-            if end >= len(text):
-                break
+                chunk = window[start:end].strip()
+                if chunk:
+                    yield chunk
                 
-            start = end - self.chunk_overlap
+                # Calculate next start position with overlap, never going backwards
+                next_start = end - self.chunk_overlap
+                start = next_start if next_start > start else end
+        
+        # Whatever remains fits in the final chunk
+        chunk = window[start:].strip()
+        if chunk:
+            yield chunk
+    
+    def _find_chunk_end(self, text: str, start: int) -> int:
+        """
+        Find where the chunk beginning at start should end
+        
+        Args:
+            text: Text with more than chunk_size characters after start
+            start: Position where the chunk begins
             
-            # Ensure we don't go backwards
-            if start <= 0:
-                start = end
+        Returns:
+            End position, preferring a sentence boundary near chunk_size
+        """
+        end = start + self.chunk_size
+        
+        # Look for sentence endings within the last 200 characters
+        search_start = max(end - 200, start)
+        sentence_endings = [
+            text.rfind('.', search_start, end),
+            text.rfind('!', search_start, end),
+            text.rfind('?', search_start, end),
+            text.rfind('\n', search_start, end)
+        ]
+        
+        best_end = max([pos for pos in sentence_endings if pos > search_start], default=end)
+        if best_end > search_start:
+            end = best_end + 1
         
-        return chunks
+        return end
     
     def get_document_info(self, pdf_path: str) -> Dict[str, any]:
         """
@@ -1,51 +1,340 @@
 import logging
-from typing import List, Dict, Tuple, Any, Optional
+import hashlib
+import os
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Dict, Iterable, Tuple, Any, Optional, FrozenSet
 import re
 from sentence_transformers import SentenceTransformer
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+import hnswlib
 import threading
-from transformers import pipeline
+import torch
+from transformers import (
+    AutoModelForQuestionAnswering,
+    AutoModelForSeq2SeqLM,
+    AutoTokenizer,
+    pipeline,
+)
 logger = logging.getLogger(__name__)
 
+# Queries whose embeddings are at least this similar share a cached answer
+SEMANTIC_CACHE_THRESHOLD = 0.95
+SEMANTIC_CACHE_MAX_SIZE = 256
+
+DEFAULT_TOP_K = 5
+
+# Documents with fewer chunks than this are searched exhaustively
+HNSW_MIN_CHUNKS = 500
+# Search breadth, fixed at build time: set_ef is not safe alongside concurrent
+# knn_query calls, and hnswlib already widens the search to k when k > ef
+HNSW_EF_SEARCH = max(50, 2 * DEFAULT_TOP_K)
+
+# Characters gathered from the start of the document before token truncation;
+# comfortably more than BART's 1024-token input window
+SUMMARY_CHAR_BUDGET = 6000
+
+# Chunk embeddings keyed by content hash, reused across uploads and restarts.
+# This keeps data derived from uploaded documents on disk; delete the
+# directory to purge it.
+EMBEDDING_CACHE_DIR = Path.home() / ".cache" / "pdfchat"
+EMBEDDING_CACHE_MAX_ENTRIES = 20000  # LRU cap, ~30MB of float32 MiniLM embeddings
+EMBEDDING_CACHE_MAX_SHARDS = 32  # Append-only shards written before compacting
+CHUNK_HASH_SIZE = 16
+
+@dataclass(frozen=True)
+class _DocumentState:
+    """Everything derived from one loaded document, swapped in as a unit"""
+    generation: int = 0
+    chunks: List[Dict[str, Any]] = field(default_factory=list)
+    embeddings: Optional[np.ndarray] = None  # int8, only when there is no ann_index
+    emb_scale: Optional[np.ndarray] = None
+    ann_index: Optional[hnswlib.Index] = None
+    chunk_wordsets: List[frozenset] = field(default_factory=list)
+    chunk_lower_texts: List[str] = field(default_factory=list)
+    inverted: Dict[str, set] = field(default_factory=dict)
+
 class QueryEngine:
     def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
         self.model_name = model_name
         self.model: Optional[SentenceTransformer] = None
-        self.document_chunks: List[Dict[str, Any]] = []
-        self.chunk_embeddings: Optional[np.ndarray] = None
+        # Replaced wholesale, never mutated, so readers always see one document
+        self._state = _DocumentState()
+        self._state_lock = threading.Lock()
         self._model_lock = threading.Lock()
+        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+
+        # Semantic answer cache, tagged with the generation of the document it belongs to
+        self._qcache_generation = 0
+        self._qcache_embs: Optional[np.ndarray] = None
+        self._qcache_answers: List[Tuple[str, int]] = []
+        self._qcache_words: List[FrozenSet[str]] = []
+        self._qcache_lock = threading.Lock()
+        self._summary_cache: Optional[Tuple[int, str]] = None  # (generation, summary)
+        self._emb_cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._emb_cache_lock = threading.Lock()
+        self._emb_shard_count = 0
 
         # Initialize models
         self._load_model()
-        self.summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
-        self.qa_model = pipeline("question-answering", model="distilbert-base-cased-distilled-squad")
+        self._load_embedding_cache()
+
+        # Summarization and QA pipelines are loaded on first use
+        self._summarizer = None
+        self._qa_model = None
+        self._pipeline_lock = threading.Lock()
+
+    @property
+    def summarizer(self):
+        if self._summarizer is None:
+            with self._pipeline_lock:
+                if self._summarizer is None:
+                    self._summarizer = self._load_pipeline("summarization", "facebook/bart-large-cnn", AutoModelForSeq2SeqLM)
+        return self._summarizer
+
+    @property
+    def qa_model(self):
+        if self._qa_model is None:
+            with self._pipeline_lock:
+                if self._qa_model is None:
+                    self._qa_model = self._load_pipeline("question-answering", "distilbert-base-cased-distilled-squad", AutoModelForQuestionAnswering)
+        return self._qa_model
+
+    @property
+    def document_chunks(self) -> List[Dict[str, Any]]:
+        return self._state.chunks
+
+    @property
+    def chunk_embeddings(self) -> Optional[np.ndarray]:
+        return self._state.embeddings
+
+    @property
+    def document_generation(self) -> int:
+        return self._state.generation
 
     def _load_model(self):
         try:
             logger.info(f"Loading sentence transformer model: {self.model_name}")
-            self.model = SentenceTransformer(self.model_name)
+            self.model = SentenceTransformer(self.model_name, device=self.device)
             logger.info("Model loaded successfully")
         except Exception as e:
             logger.error(f"Error loading model: {str(e)}")
             raise
 
-    def initialize_document(self, chunks: List[Dict[str, Any]]):
+    def _load_pipeline(self, task: str, model_name: str, model_class):
+        # FP16 on GPU; dynamic INT8 quantization of the Linear layers on CPU
         try:
-            self.document_chunks = chunks
+            logger.info(f"Loading {task} model: {model_name} on {self.device}")
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+            if self.device == 'cuda':
+                model = model_class.from_pretrained(model_name, torch_dtype=torch.float16).to(self.device)
+            else:
+                model = model_class.from_pretrained(model_name)
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            model.eval()
+
+            return pipeline(
+                task,
+                model=model,
+                tokenizer=tokenizer,
+                device=0 if self.device == 'cuda' else -1
+            )
+        except Exception as e:
+            logger.error(f"Error loading {task} model: {str(e)}")
+            raise
+
+    def initialize_document(self, chunks: Iterable[Dict[str, Any]]) -> int:
+        try:
+            # Build the new document state in locals; queries keep using the
+            # current state until it is swapped in below
+            document_chunks = list(chunks)
             if not self.model:
                 self._load_model()
 
-            chunk_texts = [chunk['text'] for chunk in chunks]
-            with self._model_lock:
-                self.chunk_embeddings = self.model.encode(chunk_texts)
+            chunk_texts = [chunk['text'] for chunk in document_chunks]
+            embeddings = self._encode_chunks(chunk_texts)
+
+            # Large documents are searched through the ANN index, which keeps its own
+            # float copy; only the exhaustive path needs the int8 matrix
+            ann_index = self._build_ann_index(embeddings)
+            if ann_index is None:
+                quantized, emb_scale = self._quantize_embeddings(embeddings)
+            else:
+                quantized, emb_scale = None, None
+
+            # Precompute keyword-matching data once instead of on every query
+            chunk_lower_texts = [text.lower() for text in chunk_texts]
+            chunk_wordsets = [self._content_words(text) for text in chunk_lower_texts]
+            inverted = defaultdict(set)
+            for i, chunk_words in enumerate(chunk_wordsets):
+                for word in chunk_words:
+                    inverted[word].add(i)
+
+            with self._state_lock:
+                new_state = _DocumentState(
+                    generation=self._state.generation + 1,
+                    chunks=document_chunks,
+                    embeddings=quantized,
+                    emb_scale=emb_scale,
+                    ann_index=ann_index,
+                    chunk_wordsets=chunk_wordsets,
+                    chunk_lower_texts=chunk_lower_texts,
+                    inverted=dict(inverted)
+                )
+                self._state = new_state
+                self._reset_query_cache(self._state.generation)
+                self._summary_cache = None
 
             logger.info("Document initialized successfully")
+            return new_state.generation
 
         except Exception as e:
             logger.error(f"Error initializing document: {str(e)}")
             raise
 
+    def _encode_chunks(self, chunk_texts: List[str]) -> np.ndarray:
+        # Only encode chunks whose content has not been embedded before
+        hashes = [
+            hashlib.blake2b(text.encode('utf-8'), digest_size=CHUNK_HASH_SIZE).digest()
+            for text in chunk_texts
+        ]
+
+        hits: Dict[int, np.ndarray] = {}
+        with self._emb_cache_lock:
+            for i, chunk_hash in enumerate(hashes):
+                embedding = self._emb_cache.get(chunk_hash)
+                if embedding is not None:
+                    self._emb_cache.move_to_end(chunk_hash)
+                    hits[i] = embedding
+        misses = [i for i in range(len(hashes)) if i not in hits]
+
+        new_embeddings = None
+        if misses:
+            with self._model_lock:
+                # L2-normalized so cosine similarity is a plain dot product
+                new_embeddings = self.model.encode(
+                    [chunk_texts[i] for i in misses],
+                    batch_size=128,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                    device=self.device
+                )
+            miss_hashes = [hashes[i] for i in misses]
+            with self._emb_cache_lock:
+                for chunk_hash, embedding in zip(miss_hashes, new_embeddings):
+                    self._emb_cache[chunk_hash] = embedding
+                self._evict_embedding_cache()
+            self._append_embedding_shard(miss_hashes, new_embeddings)
+
+        logger.info(f"Encoded {len(misses)} chunks, reused {len(hits)} cached embeddings")
+
+        # Assemble from local results; the LRU may already have evicted some of them
+        dim = new_embeddings.shape[1] if new_embeddings is not None else next(iter(hits.values())).shape[0]
+        embeddings = np.empty((len(hashes), dim), dtype=np.float32)
+        for i, embedding in hits.items():
+            embeddings[i] = embedding
+        if misses:
+            embeddings[misses] = new_embeddings
+        return embeddings
+
+    def _evict_embedding_cache(self):
+        # Caller holds _emb_cache_lock
+        while len(self._emb_cache) > EMBEDDING_CACHE_MAX_ENTRIES:
+            self._emb_cache.popitem(last=False)
+
+    def _embedding_cache_dir(self) -> Path:
+        return EMBEDDING_CACHE_DIR / self.model_name.replace('/', '_')
+
+    def _load_embedding_cache(self):
+        # Replay shards oldest first so the LRU order matches write order
+        shards = sorted(self._embedding_cache_dir().glob("shard-*.npz"))
+        for shard in shards:
+            try:
+                with np.load(shard) as data:
+                    for chunk_hash, embedding in zip(data['hashes'], data['embeddings']):
+                        self._emb_cache[chunk_hash.tobytes()] = embedding
+                        self._emb_cache.move_to_end(chunk_hash.tobytes())
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable embedding cache shard {shard}: {str(e)}")
+        self._evict_embedding_cache()
+        self._emb_shard_count = len(shards)
+
+        if self._emb_cache:
+            logger.info(f"Loaded {len(self._emb_cache)} cached chunk embeddings from {len(shards)} shards")
+        if self._emb_shard_count > EMBEDDING_CACHE_MAX_SHARDS:
+            self._compact_embedding_cache()
+
+    def _write_embedding_shard(self, hashes: List[bytes], embeddings: np.ndarray) -> Optional[Path]:
+        cache_dir = self._embedding_cache_dir()
+        path = cache_dir / f"shard-{time.time_ns():020d}-{os.getpid()}.npz"
+        tmp_path = path.with_name(path.name + ".tmp")
+
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                np.savez(
+                    f,
+                    hashes=np.frombuffer(b"".join(hashes), dtype=np.uint8).reshape(-1, CHUNK_HASH_SIZE),
+                    embeddings=np.asarray(embeddings, dtype=np.float32)
+                )
+            os.replace(tmp_path, path)
+            return path
+        except Exception as e:
+            logger.warning(f"Could not persist embedding cache shard to {path}: {str(e)}")
+            return None
+
+    def _append_embedding_shard(self, hashes: List[bytes], embeddings: np.ndarray):
+        # Disk writes scale with the new chunks only, not with the whole cache
+        if self._write_embedding_shard(hashes, embeddings) is None:
+            return
+
+        with self._emb_cache_lock:
+            self._emb_shard_count += 1
+            should_compact = self._emb_shard_count > EMBEDDING_CACHE_MAX_SHARDS
+        if should_compact:
+            self._compact_embedding_cache()
+
+    def _compact_embedding_cache(self):
+        # Rewrite the surviving LRU entries as one shard, dropping evicted ones from disk.
+        # List existing shards before the snapshot so every listed entry is captured.
+        old_shards = list(self._embedding_cache_dir().glob("shard-*.npz"))
+        with self._emb_cache_lock:
+            if not self._emb_cache:
+                return
+            hashes = list(self._emb_cache.keys())
+            embeddings = np.stack(list(self._emb_cache.values()))
+
+        if self._write_embedding_shard(hashes, embeddings) is None:
+            return
+        for shard in old_shards:
+            try:
+                shard.unlink()
+            except OSError:
+                pass
+        with self._emb_cache_lock:
+            self._emb_shard_count = 1
+        logger.info(f"Compacted embedding cache to {len(hashes)} entries")
+
+    def _quantize_embeddings(self, embeddings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Symmetric int8 quantization with one scale per embedding dimension
+        scale = np.abs(embeddings).max(axis=0)
+        scale[scale == 0] = 1.0
+        quantized = np.round(embeddings * 127 / scale).astype(np.int8)
+        return quantized, scale.astype(np.float32)
+
+    def _build_ann_index(self, embeddings: np.ndarray) -> Optional[hnswlib.Index]:
+        if len(embeddings) < HNSW_MIN_CHUNKS:
+            return None
+
+        index = hnswlib.Index(space='cosine', dim=embeddings.shape[1])
+        index.init_index(max_elements=len(embeddings), ef_construction=200, M=16)
+        index.add_items(embeddings, np.arange(len(embeddings)))
+        index.set_ef(HNSW_EF_SEARCH)
+        logger.info(f"Built HNSW index over {len(embeddings)} chunks")
+        return index
+
     # def query(self, query_text: str, top_k: int = 3) -> Tuple[str, int]:
     #     try:
     #         if not self.document_chunks or self.chunk_embeddings is None:
@@ -79,70 +368,167 @@ class QueryEngine:
     #         logger.error(f"Error processing query: {str(e)}")
     #         return f"Error processing your query: {str(e)}", 0
 
-    def query(self, query_text: str, top_k: int = 5) -> Tuple[str, int]:
+    def query(self, query_text: str, top_k: int = DEFAULT_TOP_K) -> Tuple[str, int]:
         try:
-            if not self.document_chunks or self.chunk_embeddings is None:
+            # Answer the whole query against one document, even if another upload lands meanwhile
+            state = self._state
+            if not state.chunks:
                 return "No document loaded. Please upload a PDF first.", 0
 
             # Summarization check
             if any(keyword in query_text.lower() for keyword in ["summarize", "summary", "overview"]):
-                full_text = " ".join([chunk["text"] for chunk in self.document_chunks])[:3000]
-                summary = self.summarizer(full_text, max_length=180, min_length=60, do_sample=False)[0]["summary_text"]
-                return f"📄 Summary of the document:\n\n{summary}", 1
-
-            # Get relevant chunks
-            relevant_chunks = self._find_relevant_chunks(query_text, top_k)
-            if not relevant_chunks:
-                return "I couldn't find relevant information in the document to answer your query.", 0
-
-            # Try QA on each relevant chunk and choose the best answer
-            best_answer = ""
-            best_score = -1
-            best_context = ""
-            for chunk in relevant_chunks:
-                context = chunk['text'][:1000]
-                qa_input = {"question": query_text, "context": context}
-                result = self.qa_model(qa_input)
-
-                if result['score'] > best_score:
-                    best_score = result['score']
-                    best_answer = result['answer']
-                    best_context = context
-
-            # If the score is too low or answer is not meaningful, fallback
-            if best_score < 0.3 or not best_answer or len(best_answer.strip()) < 3:
-                fallback = self._generate_response(query_text, relevant_chunks)
-                return fallback, len(relevant_chunks)
-
-            return f"💡 Answer: {best_answer.strip()}", len(relevant_chunks)
+                return f"📄 Summary of the document:\n\n{self._get_summary(state)}", 1
+
+            query_embedding = self._encode_query(query_text)
+            query_words = self._content_words(query_text)
+
+            cached = self._get_cached_answer(state.generation, query_embedding, query_words)
+            if cached is not None:
+                logger.info("Answering query from semantic cache")
+                return cached
+
+            return self._answer_query(state, query_text, query_embedding, query_words, top_k)
 
         except Exception as e:
             logger.error(f"Error processing query: {str(e)}")
             return f"Error processing your query: {str(e)}", 0
 
-
-    def _find_relevant_chunks(self, query_text: str, top_k: int) -> List[Dict[str, Any]]:
+    def _get_summary(self, state: _DocumentState) -> str:
+        cached = self._summary_cache
+        if cached is not None and cached[0] == state.generation:
+            return cached[1]
+
+        summary = self._summarize_document(state)
+
+        # Only keep the summary if its document is still the loaded one
+        with self._state_lock:
+            if state.generation == self._state.generation:
+                self._summary_cache = (state.generation, summary)
+        return summary
+
+    def _summarize_document(self, state: _DocumentState) -> str:
+        # Gather only as many leading chunks as the summarizer can use
+        parts = []
+        total_length = 0
+        for chunk in state.chunks:
+            parts.append(chunk["text"])
+            total_length += len(chunk["text"]) + 1
+            if total_length >= SUMMARY_CHAR_BUDGET:
+                break
+
+        # Let the tokenizer cut the input at the model's token limit (1024 for BART)
+        with torch.inference_mode():
+            result = self.summarizer(
+                " ".join(parts),
+                max_length=180,
+                min_length=60,
+                do_sample=False,
+                truncation=True
+            )
+        return result[0]["summary_text"]
+
+    def _answer_query(self, state: _DocumentState, query_text: str, query_embedding: np.ndarray,
+                      query_words: FrozenSet[str], top_k: int) -> Tuple[str, int]:
+        # Get relevant chunks
+        relevant_chunks = self._find_relevant_chunks(state, query_text, query_embedding, top_k)
+        if not relevant_chunks:
+            return "I couldn't find relevant information in the document to answer your query.", 0
+
+        # Run QA over all relevant chunks in one batched forward pass and choose the best answer
+        qa_inputs = [{"question": query_text, "context": chunk['text'][:1000]} for chunk in relevant_chunks]
+        with torch.inference_mode():
+            results = self.qa_model(qa_inputs, batch_size=len(qa_inputs))
+
+        # The pipeline unwraps single-item batches
+        if isinstance(results, dict):
+            results = [results]
+
+        best = max(results, key=lambda result: result['score'])
+        best_answer = best['answer']
+        best_score = best['score']
+
+        # If the score is too low or answer is not meaningful, fallback
+        if best_score < 0.3 or not best_answer or len(best_answer.strip()) < 3:
+            fallback = self._generate_response(query_text, relevant_chunks)
+            return fallback, len(relevant_chunks)
+
+        # Only extracted answers are cached; the fallbacks quote the query text back
+        result = (f"💡 Answer: {best_answer.strip()}", len(relevant_chunks))
+        self._cache_answer(state.generation, query_embedding, query_words, result)
+        return result
+
+    def _encode_query(self, query_text: str) -> np.ndarray:
+        with self._model_lock:
+            return self.model.encode(
+                query_text,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                device=self.device
+            )
+
+    def _get_cached_answer(self, generation: int, query_embedding: np.ndarray,
+                           query_words: FrozenSet[str]) -> Optional[Tuple[str, int]]:
+        with self._qcache_lock:
+            if generation != self._qcache_generation or self._qcache_embs is None:
+                return None
+
+            # Near-identical embeddings can still differ in a key term ("2019" vs "2020"),
+            # so a hit must also ask about exactly the same content words
+            similarities = self._qcache_embs @ query_embedding
+            for idx in np.flatnonzero(similarities >= SEMANTIC_CACHE_THRESHOLD):
+                if self._qcache_words[idx] == query_words:
+                    return self._qcache_answers[idx]
+            return None
+
+    def _cache_answer(self, generation: int, query_embedding: np.ndarray,
+                      query_words: FrozenSet[str], answer: Tuple[str, int]):
+        with self._qcache_lock:
+            # Drop answers computed against a document that has since been replaced
+            if generation != self._qcache_generation:
+                return
+
+            if self._qcache_embs is None:
+                self._qcache_embs = query_embedding[np.newaxis, :]
+            else:
+                self._qcache_embs = np.vstack([self._qcache_embs, query_embedding])
+            self._qcache_answers.append(answer)
+            self._qcache_words.append(query_words)
+
+            # Drop the oldest entries once the cache is full
+            if len(self._qcache_answers) > SEMANTIC_CACHE_MAX_SIZE:
+                self._qcache_embs = self._qcache_embs[-SEMANTIC_CACHE_MAX_SIZE:]
+                self._qcache_answers = self._qcache_answers[-SEMANTIC_CACHE_MAX_SIZE:]
+                self._qcache_words = self._qcache_words[-SEMANTIC_CACHE_MAX_SIZE:]
+
+    def _reset_query_cache(self, generation: int):
+        with self._qcache_lock:
+            self._qcache_generation = generation
+            self._qcache_embs = None
+            self._qcache_answers = []
+            self._qcache_words = []
+
+
+    def _find_relevant_chunks(self, state: _DocumentState, query_text: str, query_embedding: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
         try:
-            with self._model_lock:
-                query_embedding = self.model.encode([query_text])
-
-            similarities = cosine_similarity(query_embedding, self.chunk_embeddings)[0]
-            keyword_scores = self._calculate_keyword_scores(query_text)
-
-            combined_scores = []
-            for i, (sem_score, kw_score) in enumerate(zip(similarities, keyword_scores)):
-                combined_score = 0.7 * sem_score + 0.3 * kw_score
-                combined_scores.append((combined_score, i))
+            candidate_ids, similarities = self._find_candidates(state, query_embedding, top_k)
+            keyword_scores = self._calculate_keyword_scores(state, query_text, candidate_ids)
+            combined_scores = 0.7 * similarities + 0.3 * keyword_scores
 
-            combined_scores.sort(reverse=True, key=lambda x: x[0])
+            # Partial selection of the top-k, then order just those
+            if top_k < len(combined_scores):
+                top_positions = np.argpartition(-combined_scores, top_k)[:top_k]
+            else:
+                top_positions = np.arange(len(combined_scores))
+            top_positions = top_positions[np.argsort(-combined_scores[top_positions])]
 
             relevant_chunks = []
-            for score, idx in combined_scores[:top_k]:
+            for pos in top_positions:
+                score = combined_scores[pos]
                 if score > 0.1:
-                    chunk = self.document_chunks[idx].copy()
+                    chunk = state.chunks[candidate_ids[pos]].copy()
                     chunk['relevance_score'] = float(score)
-                    chunk['semantic_score'] = float(similarities[idx])
-                    chunk['keyword_score'] = float(keyword_scores[idx])
+                    chunk['semantic_score'] = float(similarities[pos])
+                    chunk['keyword_score'] = float(keyword_scores[pos])
                     relevant_chunks.append(chunk)
 
             logger.info(f"Found {len(relevant_chunks)} relevant chunks for query")
@@ -152,22 +538,53 @@ class QueryEngine:
             logger.error(f"Error finding relevant chunks: {str(e)}")
             return []
 
-    def _calculate_keyword_scores(self, query_text: str) -> List[float]:
-        query_words = set(re.findall(r'\b\w+\b', query_text.lower()))
-        query_words = {word for word in query_words if len(word) > 2}
+    def _find_candidates(self, state: _DocumentState, query_embedding: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        # Exhaustive int8 dot product for small documents
+        if state.ann_index is None:
+            return np.arange(len(state.embeddings)), self._int8_similarities(state, query_embedding)
 
+        # Over-fetch approximate neighbours so keyword re-ranking has room to work
+        k = min(top_k * 2, state.ann_index.get_current_count())
+        ids, distances = state.ann_index.knn_query(query_embedding, k=k)
+        return ids[0].astype(np.int64), 1.0 - distances[0]
+
+    def _int8_similarities(self, state: _DocumentState, query_embedding: np.ndarray) -> np.ndarray:
+        # Fold the per-dimension chunk scales into the query before quantizing it,
+        # so the integer dot product only needs a single scalar rescale
+        weighted = query_embedding * state.emb_scale
+        query_scale = float(np.abs(weighted).max()) or 1.0
+        query_int8 = np.round(weighted * 127 / query_scale).astype(np.int8)
+
+        dot = np.matmul(state.embeddings, query_int8, dtype=np.int32)
+        return dot * (query_scale / (127 * 127))
+
+    @staticmethod
+    def _content_words(text: str) -> FrozenSet[str]:
+        return frozenset(word for word in re.findall(r'\b\w+\b', text.lower()) if len(word) > 2)
+
+    def _calculate_keyword_scores(self, state: _DocumentState, query_text: str, candidate_ids: np.ndarray) -> np.ndarray:
+        query_words = self._content_words(query_text)
+
+        scores = np.zeros(len(candidate_ids))
         if not query_words:
-            return [0.0] * len(self.document_chunks)
+            return scores
+
+        # Only chunks sharing at least one query word can score above zero
+        matching_ids = set().union(*(state.inverted.get(word, ()) for word in query_words))
+        if not matching_ids:
+            return scores
 
-        scores = []
-        for chunk in self.document_chunks:
-            chunk_words = set(re.findall(r'\b\w+\b', chunk['text'].lower()))
-            intersection = query_words.intersection(chunk_words)
-            union = query_words.union(chunk_words)
+        query_lower = query_text.lower()
+        positions = np.flatnonzero(np.isin(candidate_ids, np.fromiter(matching_ids, dtype=np.int64)))
+        for pos in positions:
+            idx = candidate_ids[pos]
+            chunk_words = state.chunk_wordsets[idx]
+            intersection = len(query_words & chunk_words)
+            union = len(query_words) + len(chunk_words) - intersection
 
-            jaccard_score = len(intersection) / len(union) if union else 0.0
-            phrase_boost = 0.3 if query_text.lower() in chunk['text'].lower() else 0.0
-            scores.append(min(jaccard_score + phrase_boost, 1.0))
+            jaccard_score = intersection / union if union else 0.0
+            phrase_boost = 0.3 if query_lower in state.chunk_lower_texts[idx] else 0.0
+            scores[pos] = min(jaccard_score + phrase_boost, 1.0)
 
         return scores
 
@@ -199,6 +616,8 @@ class QueryEngine:
             return f"Found relevant information but encountered an error generating the response: {str(e)}"
 
     def clear_document(self):
-        self.document_chunks = []
-        self.chunk_embeddings = None
+        with self._state_lock:
+            self._state = _DocumentState(generation=self._state.generation + 1)
+            self._reset_query_cache(self._state.generation)
+            self._summary_cache = None
         logger.info("Document cleared from query engine")